@@ -6,8 +6,8 @@ from pathlib import Path
 
 st.set_page_config(page_title="ApexML – F1 Analytics", layout="wide")
 
-# Snowflake connection
-@st.cache_resource
+# Snowflake connection, rotated before the 4h session/JWT lifetime runs out
+@st.cache_resource(ttl=3 * 3600 + 50 * 60)
 def get_snowflake_connection():
     # Use environment variables to determine which database/schema to query
     # DEV: APEXML_DEV.ANALYTICS (for testing)
@@ -42,7 +42,7 @@ resource "snowflake_grant_privileges_to_account_role" "database_usage_ml_enginee
 
 resource "snowflake_grant_privileges_to_account_role" "raw_schema_data_engineer" {
   account_role_name = snowflake_role.data_engineer.name
-  privileges        = ["USAGE", "CREATE TABLE", "CREATE VIEW", "MODIFY"]
+  privileges        = ["USAGE", "CREATE TABLE", "CREATE VIEW", "CREATE STAGE", "MODIFY"]
   on_schema {
     schema_name = "\"${snowflake_database.apexml.name}\".\"${snowflake_schema.raw.name}\""
   }
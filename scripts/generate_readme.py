@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """Auto-generate README.md from pyproject.toml and installed packages."""
 
-import subprocess
+import hashlib
+from functools import lru_cache
+from importlib.metadata import distributions
 from pathlib import Path
 
 try:
@@ -10,48 +12,41 @@ except ImportError:
     import tomli as tomllib
 
 
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+@lru_cache(maxsize=1)
+def _read_pyproject():
+    """Read pyproject.toml once per run"""
+    return (PROJECT_ROOT / "pyproject.toml").read_bytes()
+
+
+@lru_cache(maxsize=1)
+def _load_pyproject():
+    """Parse pyproject.toml once per run"""
+    return tomllib.loads(_read_pyproject().decode("utf-8"))
+
+
 def get_direct_dependencies():
     """Extract direct dependencies from pyproject.toml"""
-    pyproject_path = Path(__file__).parent.parent / "pyproject.toml"
-    with open(pyproject_path, "rb") as f:
-        data = tomllib.load(f)
-
-    return data.get("project", {}).get("dependencies", [])
+    return _load_pyproject().get("project", {}).get("dependencies", [])
 
 
 def get_all_installed_packages():
-    """Get all installed packages from uv pip list"""
-    try:
-        result = subprocess.run(
-            ["uv", "pip", "list", "--format=columns"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-
-        if result.stdout:
-            lines = result.stdout.strip().split("\n")
-            # Skip header lines
-            package_lines = [line for line in lines[2:] if line.strip()]
-            packages = []
-
-            for line in package_lines:
-                parts = line.split()
-                if len(parts) >= 2:
-                    packages.append((parts[0], parts[1]))
-
-            return packages
-    except Exception as e:
-        print(f"Warning: Could not get package list: {e}")
-        return []
+    """Get all packages installed in the running environment"""
+    packages = {}
+    for dist in distributions():
+        name = dist.metadata["Name"]
+        # The same distribution can be visible from more than one path entry
+        if name and name not in packages:
+            packages[name] = dist.version
 
+    return sorted(packages.items(), key=lambda package: package[0].lower())
 
-def generate_readme():
-    """Generate README.md content"""
-    direct_deps = get_direct_dependencies()
-    all_packages = get_all_installed_packages()
 
-    readme_content = f"""# ApexML - F1 Race Analytics Platform
+README_SIGNATURE = "<!-- readme-signature: {signature} -->\n"
+
+README_HEADER = """# ApexML - F1 Race Analytics Platform
 
 A comprehensive data engineering platform for Formula 1 race analytics using OpenF1 API, Snowflake, dbt, and Streamlit.
 
@@ -166,17 +161,19 @@ Managed with **uv** package manager (see [pyproject.toml](pyproject.toml))
 ### Direct Dependencies
 
 ```
-{chr(10).join(direct_deps)}
-```
+"""
 
-### All Installed Packages ({len(all_packages)} total)
+README_PACKAGES_HEADER = """```
+
+### All Installed Packages ({package_count} total)
 
 <details>
 <summary>View all packages</summary>
 
 ```
-{chr(10).join(f"{name:<40} {version}" for name, version in all_packages)}
-```
+"""
+
+README_FOOTER = """```
 
 </details>
 
@@ -301,10 +298,48 @@ apex-ml/
 _README auto-generated via GitHub Actions_
 """
 
-    # Write to README.md
-    readme_path = Path(__file__).parent.parent / "README.md"
-    with open(readme_path, "w") as f:
-        f.write(readme_content)
+
+def compute_signature(all_packages):
+    """Hash the inputs that shape the README: pyproject, this script and packages"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(_read_pyproject())
+    digest.update(Path(__file__).read_bytes())
+    for name, version in all_packages:
+        digest.update(f"{name}=={version}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def readme_is_current(readme_path, signature):
+    """Check whether an existing README was generated from the same inputs"""
+    try:
+        with open(readme_path, "rb") as f:
+            first_line = f.readline(256)
+    except FileNotFoundError:
+        return False
+
+    return first_line == README_SIGNATURE.format(signature=signature).encode("utf-8")
+
+
+def generate_readme():
+    """Generate README.md content"""
+    direct_deps = get_direct_dependencies()
+    all_packages = get_all_installed_packages()
+    name_width = max((len(name) for name, _ in all_packages), default=0)
+    readme_path = PROJECT_ROOT / "README.md"
+
+    signature = compute_signature(all_packages)
+    if readme_is_current(readme_path, signature):
+        print("✓ README.md is up to date, skipping")
+        return
+
+    # Stream sections straight to disk instead of building one big string
+    with open(readme_path, "w", buffering=1 << 16, encoding="utf-8") as f:
+        f.write(README_SIGNATURE.format(signature=signature))
+        f.write(README_HEADER)
+        f.writelines(f"{dep}\n" for dep in direct_deps)
+        f.write(README_PACKAGES_HEADER.format(package_count=len(all_packages)))
+        f.writelines(f"{name.ljust(name_width)} {version}\n" for name, version in all_packages)
+        f.write(README_FOOTER)
 
     print("✓ README.md generated successfully")
     print(f"✓ Direct dependencies: {len(direct_deps)}")
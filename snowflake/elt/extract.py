@@ -1,104 +1,234 @@
 import asyncio
-from datetime import datetime
+import os
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any
 
 import httpx
+import orjson
+from aiolimiter import AsyncLimiter
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 BASE_URL = "https://api.openf1.org/v1"
+MAX_SESSION_KEY = 10_000_000
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 60.0
+
+
+def parse_session_key(value: str) -> int:
+    # Reject typos before any network work starts
+    session_key = int(value)
+    if not 0 < session_key < MAX_SESSION_KEY:
+        raise ValueError(f"session_key out of range: {session_key}")
+    return session_key
+
+
+def create_client() -> httpx.AsyncClient:
+    # All OpenF1 calls hit one origin, so a single HTTP/2 connection can
+    # multiplex every concurrent fetch instead of opening one per request.
+    # Every request, retries included, also waits on a limiter that paces
+    # the client under the API's per-second quota (override with OPENF1_RPS).
+    # The limiter lives with the client because both are bound to the event
+    # loop of the run that creates them.
+    limiter = AsyncLimiter(float(os.getenv("OPENF1_RPS", "3")), 1.0)
+
+    async def wait_for_limiter(request: httpx.Request) -> None:
+        await limiter.acquire()
+
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=8),
+        event_hooks={"request": [wait_for_limiter]},
+    )
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    # Throttling, transient server errors and dropped connections are worth
+    # another try; anything else (404, bad params) fails straight away.
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+
+def _retry_after_seconds(response: httpx.Response) -> float | None:
+    # Retry-After is either a number of seconds or an HTTP date
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+_backoff = wait_random_exponential(multiplier=1, max=30)
+
+
+def _wait_for_retry(retry_state: RetryCallState) -> float:
+    # Wait as long as the API asks when it says so (429/503 with
+    # Retry-After); otherwise back off exponentially with jitter.
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, httpx.HTTPStatusError):
+        retry_after = _retry_after_seconds(exc.response)
+        if retry_after is not None:
+            return retry_after
+    return _backoff(retry_state)
+
+
+@retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=_wait_for_retry,
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
+async def _get_json(
+    client: httpx.AsyncClient, path: str, params: dict[str, Any]
+) -> list[dict[str, Any]]:
+    response = await client.get(f"{BASE_URL}/{path}", params=params)
+    response.raise_for_status()
+    return orjson.loads(response.content)
 
 
 async def fetch_sessions(
     client: httpx.AsyncClient,
     year: int | None = None,
     session_key: int | None = None,
+    session_type: str | None = None,
 ) -> list[dict[str, Any]]:
     params = {}
     if year:
         params["year"] = year
     if session_key:
         params["session_key"] = session_key
+    if session_type:
+        params["session_type"] = session_type
 
-    response = await client.get(f"{BASE_URL}/sessions", params=params)
-    response.raise_for_status()
-    return response.json()
+    return await _get_json(client, "sessions", params)
 
 
 async def fetch_drivers(
     client: httpx.AsyncClient, session_key: int
 ) -> list[dict[str, Any]]:
-    response = await client.get(
-        f"{BASE_URL}/drivers", params={"session_key": session_key}
-    )
-    response.raise_for_status()
-    return response.json()
+    return await _get_json(client, "drivers", {"session_key": session_key})
 
 
 async def fetch_laps(
     client: httpx.AsyncClient, session_key: int
 ) -> list[dict[str, Any]]:
-    response = await client.get(f"{BASE_URL}/laps", params={"session_key": session_key})
-    response.raise_for_status()
-    return response.json()
+    return await _get_json(client, "laps", {"session_key": session_key})
 
 
 async def fetch_positions(
     client: httpx.AsyncClient, session_key: int
 ) -> list[dict[str, Any]]:
-    response = await client.get(
-        f"{BASE_URL}/position", params={"session_key": session_key}
-    )
-    response.raise_for_status()
-    return response.json()
-
-
-async def extract_session_data(session_key: int) -> dict[str, list[dict[str, Any]]]:
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        sessions_task = fetch_sessions(client, session_key=session_key)
-        drivers_task = fetch_drivers(client, session_key)
-        laps_task = fetch_laps(client, session_key)
-        positions_task = fetch_positions(client, session_key)
-
-        sessions, drivers, laps, positions = await asyncio.gather(
-            sessions_task, drivers_task, laps_task, positions_task
-        )
-
-        for record in sessions:
-            record["ingested_at"] = datetime.utcnow().isoformat()
-        for record in drivers:
-            record["ingested_at"] = datetime.utcnow().isoformat()
-        for record in laps:
-            record["ingested_at"] = datetime.utcnow().isoformat()
-        for record in positions:
-            record["ingested_at"] = datetime.utcnow().isoformat()
-
-        return {
-            "sessions": sessions,
-            "drivers": drivers,
-            "laps": laps,
-            "positions": positions,
-        }
-
+    return await _get_json(client, "position", {"session_key": session_key})
+
+
+async def extract_session_data(
+    session_key: int, client: httpx.AsyncClient | None = None
+) -> dict[str, list[dict[str, Any]]]:
+    if client is None:
+        async with create_client() as client:
+            return await extract_session_data(session_key, client)
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            sessions_task = tg.create_task(fetch_sessions(client, session_key=session_key))
+            drivers_task = tg.create_task(fetch_drivers(client, session_key))
+            laps_task = tg.create_task(fetch_laps(client, session_key))
+            positions_task = tg.create_task(fetch_positions(client, session_key))
+            detail_tasks = (drivers_task, laps_task, positions_task)
+
+            def cancel_if_unknown(task: asyncio.Task) -> None:
+                # No session row means an unknown session_key; stop the other fetches
+                if not task.cancelled() and task.exception() is None and not task.result():
+                    for detail_task in detail_tasks:
+                        detail_task.cancel()
+
+            sessions_task.add_done_callback(cancel_if_unknown)
+    except ExceptionGroup as group:
+        # Surface the underlying fetch error, as asyncio.gather used to
+        raise group.exceptions[0] from None
+
+    sessions = sessions_task.result()
+    if not sessions:
+        return {"sessions": [], "drivers": [], "laps": [], "positions": []}
+
+    drivers, laps, positions = (task.result() for task in detail_tasks)
+
+    return {
+        "sessions": sessions,
+        "drivers": drivers,
+        "laps": laps,
+        "positions": positions,
+    }
+
+
+async def extract_many(
+    session_keys: list[int],
+    concurrency: int = 8,
+    client: httpx.AsyncClient | None = None,
+) -> dict[int, dict[str, list[dict[str, Any]]]]:
+    if client is None:
+        async with create_client() as client:
+            return await extract_many(session_keys, concurrency, client)
+
+    # Bound the fan-out so a large backfill doesn't trip OpenF1's rate limits
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def extract_one(session_key: int) -> dict[str, list[dict[str, Any]]]:
+        async with semaphore:
+            return await extract_session_data(session_key, client)
+
+    results = await asyncio.gather(*(extract_one(key) for key in session_keys))
+    return dict(zip(session_keys, results))
+
+
+async def extract_latest_sessions(
+    year: int | None = None, client: httpx.AsyncClient | None = None
+) -> list[dict[str, Any]]:
+    if client is None:
+        async with create_client() as client:
+            return await extract_latest_sessions(year, client)
 
-async def extract_latest_sessions(year: int | None = None) -> list[dict[str, Any]]:
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        if year is None:
-            year = datetime.utcnow().year
-        sessions = await fetch_sessions(client, year=year)
-        return sessions
+    if year is None:
+        year = datetime.now(timezone.utc).year
+    return await fetch_sessions(client, year=year)
 
 
 if __name__ == "__main__":
     import sys
 
     if len(sys.argv) < 2:
-        print("Usage: python extract.py <session_key>")
+        print("Usage: python extract.py <session_key> [<session_key> ...]")
+        sys.exit(1)
+
+    try:
+        session_keys = [parse_session_key(arg) for arg in sys.argv[1:]]
+    except ValueError as e:
+        print(f"Invalid session_key: {e}")
         sys.exit(1)
 
-    session_key = int(sys.argv[1])
-    data = asyncio.run(extract_session_data(session_key))
+    extracted = asyncio.run(extract_many(session_keys))
 
-    print(f"Extracted data for session {session_key}:")
-    print(f"  Sessions: {len(data['sessions'])} records")
-    print(f"  Drivers: {len(data['drivers'])} records")
-    print(f"  Laps: {len(data['laps'])} records")
-    print(f"  Positions: {len(data['positions'])} records")
\ No newline at end of file
+    for session_key, data in extracted.items():
+        print(f"Extracted data for session {session_key}:")
+        print(f"  Sessions: {len(data['sessions'])} records")
+        print(f"  Drivers: {len(data['drivers'])} records")
+        print(f"  Laps: {len(data['laps'])} records")
+        print(f"  Positions: {len(data['positions'])} records")
@@ -1,16 +1,93 @@
+import json
 import os
-from datetime import datetime
+import tempfile
+from functools import lru_cache
+from operator import itemgetter
+from pathlib import Path
 from typing import Any
+from uuid import uuid4
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import snowflake.connector
-from snowflake.connector import DictCursor
 
+LOAD_STAGE = "apexml_load_stage"
 
-def get_snowflake_connection():
+_UNLOADED_SESSION_KEYS_SQL = """
+    SELECT c.value::INTEGER AS session_key
+    FROM TABLE(FLATTEN(input => PARSE_JSON(%s))) c
+    WHERE NOT EXISTS (
+        SELECT 1 FROM sessions s WHERE s.session_key = c.value::INTEGER
+    )
+"""
+
+# Parquet schemas use the OpenF1 field names; the *_COLUMNS lists rename
+# them to the RAW table columns before the file is written, and *_KEYS are
+# the natural keys the upsert matches on. ingested_at is not in the files;
+# Snowflake stamps it with SYSDATE() (UTC) as rows are written.
+SESSIONS_SCHEMA = pa.schema([
+    ("session_key", pa.int64()),
+    ("session_name", pa.string()),
+    ("session_type", pa.string()),
+    ("date_start", pa.string()),
+    ("date_end", pa.string()),
+    ("gmt_offset", pa.string()),
+    ("location", pa.string()),
+    ("country_name", pa.string()),
+    ("circuit_short_name", pa.string()),
+    ("year", pa.int64()),
+])
+SESSIONS_COLUMNS = SESSIONS_SCHEMA.names
+SESSIONS_KEYS = ["session_key"]
+
+DRIVERS_SCHEMA = pa.schema([
+    ("driver_number", pa.int64()),
+    ("session_key", pa.int64()),
+    ("broadcast_name", pa.string()),
+    ("full_name", pa.string()),
+    ("name_acronym", pa.string()),
+    ("team_name", pa.string()),
+    ("team_colour", pa.string()),
+    ("headshot_url", pa.string()),
+    ("country_code", pa.string()),
+])
+DRIVERS_COLUMNS = DRIVERS_SCHEMA.names
+DRIVERS_KEYS = ["session_key", "driver_number"]
+
+LAPS_SCHEMA = pa.schema([
+    ("session_key", pa.int64()),
+    ("driver_number", pa.int64()),
+    ("lap_number", pa.int64()),
+    ("lap_duration", pa.float64()),
+    ("duration_sector_1", pa.float64()),
+    ("duration_sector_2", pa.float64()),
+    ("duration_sector_3", pa.float64()),
+    ("is_pit_out_lap", pa.bool_()),
+    ("date_start", pa.string()),
+])
+LAPS_COLUMNS = [
+    "session_key", "driver_number", "lap_number", "lap_duration",
+    "segment_1_duration", "segment_2_duration", "segment_3_duration",
+    "is_pit_out_lap", "date_start",
+]
+LAPS_KEYS = ["session_key", "driver_number", "lap_number"]
+
+POSITIONS_SCHEMA = pa.schema([
+    ("session_key", pa.int64()),
+    ("driver_number", pa.int64()),
+    ("date", pa.string()),
+    ("position", pa.int64()),
+])
+POSITIONS_COLUMNS = POSITIONS_SCHEMA.names
+POSITIONS_KEYS = ["session_key", "driver_number", "date"]
+
+
+@lru_cache(maxsize=1)
+def _load_private_key() -> bytes:
     from cryptography.hazmat.backends import default_backend
     from cryptography.hazmat.primitives import serialization
 
-    # Read and parse the private key
+    # Read and parse the private key once per process
     with open(os.path.expanduser("~/.ssh/snowflake_key.p8"), "rb") as key_file:
         private_key = serialization.load_pem_private_key(
             key_file.read(),
@@ -18,151 +95,142 @@ def get_snowflake_connection():
             backend=default_backend()
         )
 
-    pkb = private_key.private_bytes(
+    return private_key.private_bytes(
         encoding=serialization.Encoding.DER,
         format=serialization.PrivateFormat.PKCS8,
         encryption_algorithm=serialization.NoEncryption()
     )
 
+
+def get_snowflake_connection():
     return snowflake.connector.connect(
         account=os.getenv("SNOWFLAKE_ACCOUNT"),
         user=os.getenv("SNOWFLAKE_USER"),
-        private_key=pkb,
+        private_key=_load_private_key(),
         database=os.getenv("SNOWFLAKE_DATABASE", "APEXML_DEV"),
         schema=os.getenv("SNOWFLAKE_SCHEMA", "RAW"),
         warehouse=os.getenv("SNOWFLAKE_WAREHOUSE", "ETL_WH_DEV"),
         role=os.getenv("SNOWFLAKE_ROLE", "DATA_ENGINEER"),
+        # Each loader commits its batch once instead of per statement
+        autocommit=False,
+        # Keep the session alive across long historical runs on one connection
+        client_session_keep_alive=True,
     )
 
 
-def load_sessions(conn, sessions: list[dict[str, Any]]) -> int:
-    cursor = conn.cursor()
-    count = 0
-
-    for session in sessions:
-        cursor.execute(
-            """
-            INSERT INTO sessions (
-                session_key, session_name, session_type, date_start, date_end,
-                gmt_offset, location, country_name, circuit_short_name, year, ingested_at
-            ) VALUES (
-                %(session_key)s, %(session_name)s, %(session_type)s, %(date_start)s,
-                %(date_end)s, %(gmt_offset)s, %(location)s, %(country_name)s,
-                %(circuit_short_name)s, %(year)s, %(ingested_at)s
-            )
-            """,
-            session,
-        )
-        count += 1
+def get_unloaded_session_keys(conn, session_keys: list[int]) -> set[int]:
+    # Send the candidate keys as one JSON array and let Snowflake return only
+    # the ones not yet in RAW, instead of pulling every loaded key back.
+    if not session_keys:
+        return set()
 
-    conn.commit()
-    cursor.close()
-    return count
+    with conn.cursor() as cursor:
+        cursor.execute(_UNLOADED_SESSION_KEYS_SQL, (json.dumps(session_keys),))
+        return set(map(itemgetter(0), cursor))
 
 
-def load_drivers(conn, drivers: list[dict[str, Any]]) -> int:
-    cursor = conn.cursor()
-    count = 0
-
-    for driver in drivers:
-        cursor.execute(
-            """
-            INSERT INTO drivers (
-                driver_number, session_key, broadcast_name, full_name, name_acronym,
-                team_name, team_colour, headshot_url, country_code, ingested_at
-            ) VALUES (
-                %(driver_number)s, %(session_key)s, %(broadcast_name)s, %(full_name)s,
-                %(name_acronym)s, %(team_name)s, %(team_colour)s, %(headshot_url)s,
-                %(country_code)s, %(ingested_at)s
-            )
-            """,
-            driver,
-        )
-        count += 1
+def _merge_sql(table: str, staging: str, columns: list[str], keys: list[str]) -> str:
+    # Keep one staged row per key so a repeated sample can't make the MERGE
+    # hit the same target row twice, and compare keys with EQUAL_NULL so a
+    # row with a NULL key part updates its earlier copy instead of piling up.
+    partition = ", ".join(keys)
+    on = " AND ".join(f"EQUAL_NULL(t.{key}, s.{key})" for key in keys)
+    updates = ", ".join(
+        [*(f"t.{col} = s.{col}" for col in columns if col not in keys), "t.ingested_at = SYSDATE()"]
+    )
+    inserts = ", ".join([*columns, "ingested_at"])
+    values = ", ".join([*(f"s.{col}" for col in columns), "SYSDATE()"])
+    return f"""
+        MERGE INTO {table} t
+        USING (
+            SELECT * FROM {staging}
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY 1) = 1
+        ) s
+        ON {on}
+        WHEN MATCHED THEN UPDATE SET {updates}
+        WHEN NOT MATCHED THEN INSERT ({inserts}) VALUES ({values})
+    """
+
+
+def _bulk_load(
+    conn,
+    table: str,
+    rows: list[dict[str, Any]],
+    schema: pa.Schema,
+    columns: list[str],
+    keys: list[str],
+) -> int:
+    # Build the table columnar straight from the records, renaming OpenF1
+    # field names to RAW column names, and bulk load it as one Parquet file.
+    # The file is copied into a temporary staging table and upserted with a
+    # single MERGE on the table's natural key, so reloading a session does
+    # not duplicate rows.
+    if not rows:
+        return 0
+
+    arrow_table = pa.Table.from_pylist(rows, schema=schema).rename_columns(columns)
+    staging = f"{table}_staging"
+    with conn.cursor() as cursor:
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                file_path = Path(tmp_dir) / f"{table}_{uuid4().hex}.parquet"
+                pq.write_table(arrow_table, file_path, compression="snappy")
+
+                cursor.execute(f"CREATE TEMPORARY STAGE IF NOT EXISTS {LOAD_STAGE}")
+                cursor.execute(
+                    f"PUT 'file://{file_path.as_posix()}' @{LOAD_STAGE} AUTO_COMPRESS = FALSE"
+                )
+                cursor.execute(f"CREATE OR REPLACE TEMPORARY TABLE {staging} LIKE {table}")
+                cursor.execute(
+                    f"""
+                    COPY INTO {staging}
+                    FROM @{LOAD_STAGE}/{file_path.name}
+                    FILE_FORMAT = (TYPE = PARQUET)
+                    MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+                    PURGE = TRUE
+                    """
+                )
+                cursor.execute(_merge_sql(table, staging, columns, keys))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return arrow_table.num_rows
 
-    conn.commit()
-    cursor.close()
-    return count
 
+def load_sessions(conn, sessions: list[dict[str, Any]]) -> int:
+    return _bulk_load(
+        conn, "sessions", sessions, SESSIONS_SCHEMA, SESSIONS_COLUMNS, SESSIONS_KEYS
+    )
 
-def load_laps(conn, laps: list[dict[str, Any]]) -> int:
-    cursor = conn.cursor()
-    count = 0
-
-    for lap in laps:
-        cursor.execute(
-            """
-            INSERT INTO laps (
-                session_key, driver_number, lap_number, lap_duration,
-                segment_1_duration, segment_2_duration, segment_3_duration,
-                is_pit_out_lap, date_start, ingested_at
-            ) VALUES (
-                %(session_key)s, %(driver_number)s, %(lap_number)s, %(lap_duration)s,
-                %(duration_sector_1)s, %(duration_sector_2)s, %(duration_sector_3)s,
-                %(is_pit_out_lap)s, %(date_start)s, %(ingested_at)s
-            )
-            """,
-            {
-                "session_key": lap.get("session_key"),
-                "driver_number": lap.get("driver_number"),
-                "lap_number": lap.get("lap_number"),
-                "lap_duration": lap.get("lap_duration"),
-                "duration_sector_1": lap.get("duration_sector_1"),
-                "duration_sector_2": lap.get("duration_sector_2"),
-                "duration_sector_3": lap.get("duration_sector_3"),
-                "is_pit_out_lap": lap.get("is_pit_out_lap"),
-                "date_start": lap.get("date_start"),
-                "ingested_at": lap.get("ingested_at"),
-            },
-        )
-        count += 1
 
-    conn.commit()
-    cursor.close()
-    return count
+def load_drivers(conn, drivers: list[dict[str, Any]]) -> int:
+    return _bulk_load(
+        conn, "drivers", drivers, DRIVERS_SCHEMA, DRIVERS_COLUMNS, DRIVERS_KEYS
+    )
 
 
-def load_positions(conn, positions: list[dict[str, Any]]) -> int:
-    cursor = conn.cursor()
-    count = 0
-
-    for position in positions:
-        cursor.execute(
-            """
-            INSERT INTO positions (
-                session_key, driver_number, date, position, ingested_at
-            ) VALUES (
-                %(session_key)s, %(driver_number)s, %(date)s, %(position)s, %(ingested_at)s
-            )
-            """,
-            {
-                "session_key": position.get("session_key"),
-                "driver_number": position.get("driver_number"),
-                "date": position.get("date"),
-                "position": position.get("position"),
-                "ingested_at": position.get("ingested_at"),
-            },
-        )
-        count += 1
-
-    conn.commit()
-    cursor.close()
-    return count
+def load_laps(conn, laps: list[dict[str, Any]]) -> int:
+    return _bulk_load(conn, "laps", laps, LAPS_SCHEMA, LAPS_COLUMNS, LAPS_KEYS)
 
 
-def load_all(data: dict[str, list[dict[str, Any]]]):
-    conn = get_snowflake_connection()
+def load_positions(conn, positions: list[dict[str, Any]]) -> int:
+    return _bulk_load(
+        conn, "positions", positions, POSITIONS_SCHEMA, POSITIONS_COLUMNS, POSITIONS_KEYS
+    )
 
-    try:
-        # Ensure warehouse is active
-        cursor = conn.cursor()
-        warehouse = os.getenv("SNOWFLAKE_WAREHOUSE", "ETL_WH_DEV")
-        cursor.execute(f"ALTER WAREHOUSE {warehouse} RESUME IF SUSPENDED")
-        cursor.close()
 
-        sessions_count = load_sessions(conn, data["sessions"])
-        print(f"Loaded {sessions_count} sessions")
+def load_all(data: dict[str, list[dict[str, Any]]], conn=None):
+    # Callers loading many sessions pass a shared connection; otherwise
+    # open one just for this load.
+    owns_connection = conn is None
+    if owns_connection:
+        conn = get_snowflake_connection()
 
+    try:
+        # The ETL warehouse has auto_resume enabled (infra/snowflake/main.tf),
+        # so the first statement below wakes it if it is suspended
         drivers_count = load_drivers(conn, data["drivers"])
         print(f"Loaded {drivers_count} drivers")
 
@@ -172,19 +240,30 @@ def load_all(data: dict[str, list[dict[str, Any]]]):
         positions_count = load_positions(conn, data["positions"])
         print(f"Loaded {positions_count} positions")
 
+        # Sessions go last: a SESSIONS row marks the session as loaded for
+        # load_historical, so it is only committed once every detail table is
+        sessions_count = load_sessions(conn, data["sessions"])
+        print(f"Loaded {sessions_count} sessions")
+
     finally:
-        conn.close()
+        if owns_connection:
+            conn.close()
 
 
 if __name__ == "__main__":
     import sys
-    from extract import extract_session_data
+    from extract import extract_session_data, parse_session_key
     import asyncio
 
     if len(sys.argv) < 2:
         print("Usage: python load.py <session_key>")
         sys.exit(1)
 
-    session_key = int(sys.argv[1])
+    try:
+        session_key = parse_session_key(sys.argv[1])
+    except ValueError as e:
+        print(f"Invalid session_key: {e}")
+        sys.exit(1)
+
     data = asyncio.run(extract_session_data(session_key))
     load_all(data)
\ No newline at end of file
@@ -4,99 +4,163 @@ This will fetch all available sessions and load them into Snowflake.
 """
 import asyncio
 import sys
-from extract import extract_session_data
-from load import load_all
+from operator import itemgetter
+from extract import create_client, extract_session_data, fetch_sessions
+from load import get_snowflake_connection, get_unloaded_session_keys, load_all
 import httpx
 
 
-async def get_all_sessions():
-    """Fetch all available sessions from OpenF1 API."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get("https://api.openf1.org/v1/sessions")
-        response.raise_for_status()
-        return response.json()
+async def get_all_sessions(
+    year: int = None, session_type: str = None, client: httpx.AsyncClient | None = None
+):
+    """Fetch available sessions from OpenF1 API, optionally filtered by year and type."""
+    if client is None:
+        async with create_client() as client:
+            return await get_all_sessions(year, session_type, client)
 
+    return await fetch_sessions(client, year=year, session_type=session_type)
 
-async def load_historical_data(year: int = None, session_type: str = None):
+
+async def load_historical_data(
+    year: int = None, session_type: str = None, client: httpx.AsyncClient | None = None
+):
     """
     Load historical F1 data.
 
     Args:
         year: Filter by specific year (e.g., 2023, 2024). If None, loads all years.
         session_type: Filter by session type (e.g., 'Race', 'Qualifying'). If None, loads all types.
+        client: HTTP client shared by every OpenF1 call. If None, one is created for the run.
     """
-    print("Fetching available sessions from OpenF1 API...")
-    all_sessions = await get_all_sessions()
-
-    # Filter sessions
-    filtered_sessions = all_sessions
-
-    if year:
-        filtered_sessions = [s for s in filtered_sessions if s.get('year') == year]
-        print(f"Filtering for year {year}")
-
-    if session_type:
-        filtered_sessions = [s for s in filtered_sessions if s.get('session_type') == session_type]
-        print(f"Filtering for session type {session_type}")
-
-    # Sort by year and date
-    filtered_sessions = sorted(
-        filtered_sessions,
-        key=lambda s: (s.get('year', 0), s.get('date_start', ''))
-    )
-
-    print(f"\nFound {len(filtered_sessions)} sessions to load")
-
-    # Show summary by year and type
-    from collections import defaultdict
-    summary = defaultdict(lambda: defaultdict(int))
-    for session in filtered_sessions:
-        summary[session.get('year')][session.get('session_type')] += 1
-
-    print("\nSessions by year and type:")
-    for year in sorted(summary.keys()):
-        print(f"\n{year}:")
-        for session_type, count in sorted(summary[year].items()):
-            print(f"  {session_type}: {count}")
+    if client is None:
+        async with create_client() as client:
+            return await load_historical_data(year, session_type, client)
 
-    # Ask for confirmation
-    print(f"\nThis will load {len(filtered_sessions)} sessions into Snowflake.")
-    response = input("Continue? (yes/no): ")
-
-    if response.lower() != 'yes':
-        print("Aborted.")
-        return
-
-    # Load each session
-    successful = 0
-    failed = 0
-    failed_sessions = []
-
-    for i, session in enumerate(filtered_sessions, 1):
-        session_key = session.get('session_key')
-        session_name = session.get('session_name')
-        session_type_val = session.get('session_type')
-        year_val = session.get('year')
-
-        print(f"\n[{i}/{len(filtered_sessions)}] Loading {year_val} {session_name} ({session_type_val}) - Session Key: {session_key}")
-
-        try:
-            # Extract data for this session
-            data = await extract_session_data(session_key)
-
-            # Load into Snowflake
-            load_all(data)
-            successful += 1
-
-        except Exception as e:
+    print("Fetching available sessions from OpenF1 API...")
+    # Open the Snowflake connection while the session list downloads; one
+    # connection serves the whole run instead of one per session
+    connecting = asyncio.create_task(asyncio.to_thread(get_snowflake_connection))
+    try:
+        # OpenF1 applies the year and type filters so only matching sessions download
+        all_sessions = await get_all_sessions(year, session_type, client)
+    except BaseException:
+        # Wait for the connect started alongside the listing and close it
+        (await connecting).close()
+        raise
+    conn = await connecting
+
+    # Everything after the connect runs under this try so the connection is
+    # closed on errors, on an aborted prompt, and on Ctrl-C or EOF at input()
+    try:
+        if year:
+            print(f"Filtering for year {year}")
+
+        if session_type:
+            print(f"Filtering for session type {session_type}")
+
+        # Drop sessions the API returned without a year or start date; they
+        # can't be ordered and would abort the sort for the whole run
+        filtered_sessions = [
+            s for s in all_sessions
+            if s.get('year') is not None and s.get('date_start') is not None
+        ]
+
+        # Sort by year and date
+        filtered_sessions = sorted(filtered_sessions, key=itemgetter('year', 'date_start'))
+
+        # Ask Snowflake once per run which of these sessions are not in RAW yet,
+        # before the summary so the count the user confirms is what will load
+        unloaded_keys = await asyncio.to_thread(
+            get_unloaded_session_keys, conn, [s.get('session_key') for s in filtered_sessions]
+        )
+        pending_sessions = [s for s in filtered_sessions if s.get('session_key') in unloaded_keys]
+        skipped = len(filtered_sessions) - len(pending_sessions)
+        if skipped:
+            print(f"Skipping {skipped} sessions already loaded")
+
+        print(f"\nFound {len(pending_sessions)} sessions to load")
+
+        # Show summary by year and type
+        from collections import defaultdict
+        summary = defaultdict(lambda: defaultdict(int))
+        for session in pending_sessions:
+            summary[session.get('year')][session.get('session_type')] += 1
+
+        print("\nSessions by year and type:")
+        for year in sorted(summary.keys()):
+            print(f"\n{year}:")
+            for session_type, count in sorted(summary[year].items()):
+                print(f"  {session_type}: {count}")
+
+        # Ask for confirmation
+        print(f"\nThis will load {len(pending_sessions)} sessions into Snowflake.")
+        response = input("Continue? (yes/no): ")
+
+        if response.lower() != 'yes':
+            print("Aborted.")
+            return
+
+        # Extract up to four sessions at once while a single consumer loads them
+        # one at a time on the shared connection. Extract slots are held until the
+        # result is queued, so at most four sessions are in flight plus two waiting.
+        successful = 0
+        failed = 0
+        failed_sessions = []
+        queue = asyncio.Queue(maxsize=2)
+        extract_slots = asyncio.Semaphore(4)
+
+        def record_failure(session, e):
+            nonlocal failed
+            session_key = session.get('session_key')
             print(f"ERROR loading session {session_key}: {e}")
             failed += 1
-            failed_sessions.append((session_key, session_name, year_val, str(e)))
-            # Continue with next session
+            failed_sessions.append((session_key, session.get('session_name'), session.get('year'), str(e)))
+
+        async def produce_one(i, session):
+            session_key = session.get('session_key')
+            session_name = session.get('session_name')
+            session_type_val = session.get('session_type')
+            year_val = session.get('year')
+
+            async with extract_slots:
+                print(f"\n[{i}/{len(pending_sessions)}] Loading {year_val} {session_name} ({session_type_val}) - Session Key: {session_key}")
+
+                try:
+                    # Extract data for this session
+                    data = await extract_session_data(session_key, client)
+                except Exception as e:
+                    record_failure(session, e)
+                    return
+
+                await queue.put((session, data))
+
+        async def produce():
+            async with asyncio.TaskGroup() as tg:
+                for i, session in enumerate(pending_sessions, 1):
+                    tg.create_task(produce_one(i, session))
+
+            await queue.put(None)
+
+        async def consume():
+            nonlocal successful
+            while (item := await queue.get()) is not None:
+                session, data = item
+                try:
+                    # Load into Snowflake off the event loop so extraction keeps going
+                    await asyncio.to_thread(load_all, data, conn)
+                    successful += 1
+                except Exception as e:
+                    record_failure(session, e)
+                    # Continue with next session
+
+        await asyncio.gather(produce(), consume())
+    finally:
+        conn.close()
 
     print(f"\n{'='*80}")
     print(f"SUMMARY:")
     print(f"  Total sessions: {len(filtered_sessions)}")
+    print(f"  Skipped (already loaded): {skipped}")
     print(f"  Successful: {successful}")
     print(f"  Failed: {failed}")
 
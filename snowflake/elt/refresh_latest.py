@@ -4,52 +4,53 @@ Fetches the latest completed race session and runs the full ELT pipeline.
 """
 import asyncio
 import sys
-import subprocess
+from operator import itemgetter
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
-from extract import extract_session_data
+from extract import create_client, extract_session_data, fetch_sessions
 from load import load_all
 import httpx
+from dbt.cli.main import dbtRunner
+from dbt.contracts.results import RunStatus
 
 
-async def get_latest_race_session():
+async def get_latest_race_session(client: httpx.AsyncClient | None = None):
     """Fetch the most recent completed race session."""
-    async with httpx.AsyncClient() as client:
-        # Get all race sessions
-        response = await client.get(
-            "https://api.openf1.org/v1/sessions",
-            params={"session_type": "Race"}
-        )
-        response.raise_for_status()
-        sessions = response.json()
+    if client is None:
+        async with create_client() as client:
+            return await get_latest_race_session(client)
+
+    # Only this season's races can be the latest; before the first race of
+    # the year, fall back to last season
+    now = datetime.now(timezone.utc)
+    for year in (now.year, now.year - 1):
+        sessions = await fetch_sessions(client, year=year, session_type="Race")
 
         # Filter for completed sessions (ended in the past)
-        now = datetime.now(timezone.utc)
         completed_sessions = [
             s for s in sessions
             if s.get('date_end') and datetime.fromisoformat(s['date_end'].replace('Z', '+00:00')) < now
         ]
 
-        # Sort by date_end descending to get most recent
-        completed_sessions.sort(
-            key=lambda s: s.get('date_end', ''),
-            reverse=True
-        )
-
-        if not completed_sessions:
-            print("No completed race sessions found")
-            return None
+        if completed_sessions:
+            # Most recent by date_end in a single pass
+            return max(completed_sessions, key=itemgetter('date_end'))
 
-        return completed_sessions[0]
+    print("No completed race sessions found")
+    return None
 
 
-async def refresh_pipeline():
+async def refresh_pipeline(client: httpx.AsyncClient | None = None):
     """
     Run the full data refresh pipeline:
     1. Extract latest race data from OpenF1 API
     2. Load into Snowflake RAW tables
     3. Run dbt transformations to update STAGING and ANALYTICS
     """
+    if client is None:
+        async with create_client() as client:
+            return await refresh_pipeline(client)
+
     print("="*80)
     print("F1 DATA REFRESH PIPELINE")
     print(f"Started at: {datetime.now(timezone.utc).isoformat()}")
@@ -57,7 +58,7 @@ async def refresh_pipeline():
 
     # Step 1: Get latest race session
     print("\n[1/3] Fetching latest race session from OpenF1 API...")
-    latest_session = await get_latest_race_session()
+    latest_session = await get_latest_race_session(client)
 
     if not latest_session:
         print("No new sessions to load. Exiting.")
@@ -73,7 +74,7 @@ async def refresh_pipeline():
     # Step 2: Extract and load to RAW
     print("\n[2/3] Extracting race data and loading to RAW tables...")
     try:
-        data = await extract_session_data(session_key)
+        data = await extract_session_data(session_key, client)
         load_all(data)
         print(f"Successfully loaded session {session_key} to RAW tables")
     except Exception as e:
@@ -82,30 +83,32 @@ async def refresh_pipeline():
 
     # Step 3: Run dbt transformations
     print("\n[3/3] Running dbt transformations (STAGING → ANALYTICS)...")
-    try:
-        # Get project root
-        project_root = Path(__file__).parent.parent.parent
-        dbt_project_dir = project_root / "snowflake" / "dbt_project"
-
-        # Run dbt
-        result = subprocess.run(
-            ["uv", "run", "dbt", "run", "--target", "dev"],
-            cwd=str(dbt_project_dir),
-            capture_output=True,
-            text=True
-        )
-
-        if result.returncode != 0:
-            print(f"ERROR running dbt:\n{result.stderr}")
-            sys.exit(1)
-
-        print("dbt transformations completed successfully")
-        print(result.stdout)
-
-    except Exception as e:
-        print(f"ERROR running dbt: {e}")
+    # Get project root
+    project_root = Path(__file__).parent.parent.parent
+    dbt_project_dir = project_root / "snowflake" / "dbt_project"
+
+    # Run dbt in this process instead of spawning a new interpreter
+    result = dbtRunner().invoke([
+        "run", "--target", "dev",
+        "--project-dir", str(dbt_project_dir),
+        "--profiles-dir", str(dbt_project_dir),
+    ])
+
+    if not result.success:
+        if result.exception:
+            print(f"ERROR running dbt: {result.exception}")
+        else:
+            # Report the models that errored apart from the downstream
+            # ones dbt skipped because of them
+            failed = [r.node.name for r in result.result if r.status == RunStatus.Error]
+            skipped = [r.node.name for r in result.result if r.status == RunStatus.Skipped]
+            print(f"ERROR running dbt, failed models: {', '.join(failed)}")
+            if skipped:
+                print(f"Skipped downstream models: {', '.join(skipped)}")
         sys.exit(1)
 
+    print("dbt transformations completed successfully")
+
     print("\n" + "="*80)
     print("PIPELINE COMPLETED SUCCESSFULLY")
     print(f"Finished at: {datetime.now(timezone.utc).isoformat()}")
@@ -1,30 +1,43 @@
 import pytest
 import httpx
 import logging
-from datetime import datetime
+import time
+from logging.handlers import MemoryHandler
+
+# Configure logging; file writes are buffered and flushed in batches, on
+# errors, or when logging shuts down at exit
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+file_handler = logging.FileHandler('logs/test_api.log')
+file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
-# Configure logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/test_api.log'),
-        logging.StreamHandler()
-    ]
+    format=LOG_FORMAT,
+    handlers=[logging.StreamHandler()]
 )
+# basicConfig does nothing when the root logger already has handlers, as it
+# does under pytest, so the file handler goes on this module's logger instead
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(MemoryHandler(capacity=512, flushLevel=logging.ERROR, target=file_handler))
 
 BASE_URL = "https://api.openf1.org/v1"
 
 
+@pytest.fixture(scope="session")
+def client():
+    """Create one HTTP/2 httpx client with timeout, shared by every test"""
+    with httpx.Client(
+        http2=True,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=1, keepalive_expiry=30.0),
+    ) as client:
+        yield client
+
+
 class TestOpenF1API:
     """Tests for OpenF1 API connectivity and response validation"""
 
-    @pytest.fixture
-    def client(self):
-        """Create httpx client with timeout"""
-        return httpx.Client(timeout=10.0)
-
     def test_api_availability(self, client):
         """Test that the OpenF1 API is reachable"""
         logger.info("Testing API availability")
@@ -40,77 +53,50 @@ class TestOpenF1API:
             logger.error(f"API request error: {e}")
             pytest.fail(f"Failed to connect to API: {e}")
 
-    def test_sessions_endpoint(self, client):
-        """Test sessions endpoint returns valid data"""
-        logger.info("Testing /sessions endpoint")
-        response = client.get(f"{BASE_URL}/sessions", params={"year": 2024, "limit": 5})
-
-        assert response.status_code == 200
-        data = response.json()
-        assert isinstance(data, list)
-        assert len(data) > 0
-
-        # Validate session structure
-        session = data[0]
-        required_fields = ["session_key", "session_name", "date_start", "year"]
-        for field in required_fields:
-            assert field in session, f"Missing required field: {field}"
-
-        logger.info(f"✓ Sessions endpoint returned {len(data)} sessions")
-
-    def test_drivers_endpoint(self, client):
-        """Test drivers endpoint returns valid data"""
-        logger.info("Testing /drivers endpoint")
-        response = client.get(f"{BASE_URL}/drivers", params={"session_key": 9662, "limit": 5})
-
-        assert response.status_code == 200
-        data = response.json()
-        assert isinstance(data, list)
-
-        if len(data) > 0:
-            driver = data[0]
-            required_fields = ["driver_number", "full_name", "team_name"]
-            for field in required_fields:
-                assert field in driver, f"Missing required field: {field}"
-            logger.info(f"✓ Drivers endpoint returned {len(data)} drivers")
-        else:
-            logger.warning("No drivers returned for session_key 9662")
-
-    def test_laps_endpoint(self, client):
-        """Test laps endpoint returns valid data"""
-        logger.info("Testing /laps endpoint")
-        response = client.get(f"{BASE_URL}/laps", params={"session_key": 9662, "limit": 10})
-
-        assert response.status_code == 200
-        data = response.json()
-        assert isinstance(data, list)
-
-        if len(data) > 0:
-            lap = data[0]
-            required_fields = ["session_key", "driver_number", "lap_number", "lap_duration"]
-            for field in required_fields:
-                assert field in lap, f"Missing required field: {field}"
-            logger.info(f"✓ Laps endpoint returned {len(data)} laps")
-        else:
-            logger.warning("No laps returned for session_key 9662")
-
-    def test_positions_endpoint(self, client):
-        """Test positions endpoint returns valid data"""
-        logger.info("Testing /position endpoint")
-        response = client.get(f"{BASE_URL}/position", params={"session_key": 9662, "limit": 10})
+    @pytest.mark.parametrize(
+        ("endpoint", "params", "required_fields", "require_rows"),
+        [
+            pytest.param(
+                "sessions", {"year": 2024, "limit": 5},
+                ["session_key", "session_name", "date_start", "year"], True,
+                id="sessions",
+            ),
+            pytest.param(
+                "drivers", {"session_key": 9662, "limit": 5},
+                ["driver_number", "full_name", "team_name"], False,
+                id="drivers",
+            ),
+            pytest.param(
+                "laps", {"session_key": 9662, "limit": 10},
+                ["session_key", "driver_number", "lap_number", "lap_duration"], False,
+                id="laps",
+            ),
+            pytest.param(
+                "position", {"session_key": 9662, "limit": 10},
+                ["session_key", "driver_number", "position"], False,
+                id="position",
+            ),
+        ],
+    )
+    def test_endpoint(self, client, endpoint, params, required_fields, require_rows):
+        """Test each data endpoint returns valid data"""
+        logger.info(f"Testing /{endpoint} endpoint")
+        response = client.get(f"{BASE_URL}/{endpoint}", params=params)
 
         assert response.status_code == 200
         data = response.json()
         assert isinstance(data, list)
+        if require_rows:
+            assert len(data) > 0
 
         if len(data) > 0:
-            position = data[0]
-            required_fields = ["session_key", "driver_number", "position"]
+            # Validate record structure
+            record = data[0]
             for field in required_fields:
-                assert field in position, f"Missing required field: {field}"
-            logger.info(f"✓ Position endpoint returned {len(data)} positions")
+                assert field in record, f"Missing required field: {field}"
+            logger.info(f"✓ /{endpoint} endpoint returned {len(data)} records")
         else:
-            logger.warning("No positions returned for session_key 9662")
+            logger.warning(f"No records returned from /{endpoint} for {params}")
 
     def test_invalid_endpoint(self, client):
         """Test that invalid endpoints return 404"""
@@ -139,7 +125,7 @@ class TestOpenF1API:
         for i in range(5):
             response = client.get(f"{BASE_URL}/sessions", params={"limit": 1})
             responses.append(response.status_code)
-            logger.debug(f"Request {i+1}: {response.status_code}")
+            logger.debug("Request %d: %s", i + 1, response.status_code)
 
         # All requests should succeed (OpenF1 is generally permissive)
         assert all(status == 200 for status in responses)
@@ -148,9 +134,9 @@ class TestOpenF1API:
     def test_response_time(self, client):
         """Test that API responds within acceptable time"""
         logger.info("Testing API response time")
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         response = client.get(f"{BASE_URL}/sessions", params={"limit": 1})
-        elapsed = (datetime.now() - start_time).total_seconds()
+        elapsed = time.perf_counter() - start_time
 
         assert response.status_code == 200
         assert elapsed < 5.0, f"API response too slow: {elapsed}s"
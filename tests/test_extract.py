@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+import extract
+
+
+class TestParseSessionKey:
+    """Tests for validating session keys before any request is made"""
+
+    @pytest.mark.parametrize("value", ["1", "9662", " 9662 ", str(extract.MAX_SESSION_KEY - 1)])
+    def test_accepts_valid_keys(self, value):
+        """Test in-range integer keys parse to int"""
+        assert extract.parse_session_key(value) == int(value)
+
+    @pytest.mark.parametrize(
+        "value",
+        ["0", "-5", str(extract.MAX_SESSION_KEY), "99999999", "latest", "96.62", "9662abc", ""],
+    )
+    def test_rejects_invalid_keys(self, value):
+        """Test zero, negative, too-large and non-integer keys raise ValueError"""
+        with pytest.raises(ValueError):
+            extract.parse_session_key(value)
+
+    @pytest.mark.parametrize("value", ["0", "-5", "99999999", "latest"])
+    def test_argparse_reports_invalid_keys(self, value, capsys):
+        """Test the ValueError becomes an argparse usage error when used as a type"""
+        parser = argparse.ArgumentParser(prog="extract")
+        parser.add_argument("session_key", type=extract.parse_session_key)
+
+        with pytest.raises(SystemExit) as exc_info:
+            parser.parse_args(["--", value])
+
+        assert exc_info.value.code == 2
+        assert "invalid parse_session_key value" in capsys.readouterr().err
+
+
+def run_get_json(handler, monkeypatch):
+    """Call _get_json against a MockTransport, recording retry waits instead of sleeping"""
+    waits = []
+
+    async def fake_sleep(seconds):
+        waits.append(seconds)
+
+    monkeypatch.setattr(extract._get_json.retry, "sleep", fake_sleep)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await extract._get_json(client, "sessions", {"year": 2024})
+
+    return asyncio.run(run()), waits
+
+
+def failing_then_ok(*failures):
+    """Handler that answers with each failure in turn, then a 200"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) <= len(failures):
+            failure = failures[len(calls) - 1]
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+        return httpx.Response(200, json=[{"session_key": 9662}])
+
+    return handler, calls
+
+
+class TestGetJsonRetries:
+    """Tests for which OpenF1 failures are retried and how long each retry waits"""
+
+    @pytest.mark.parametrize(
+        "failure",
+        [
+            pytest.param(httpx.Response(429), id="429"),
+            pytest.param(httpx.Response(500), id="500"),
+            pytest.param(httpx.Response(502), id="502"),
+            pytest.param(httpx.Response(503), id="503"),
+            pytest.param(httpx.Response(504), id="504"),
+            pytest.param(httpx.ConnectError("connection refused"), id="connect-error"),
+            pytest.param(httpx.ReadTimeout("timed out"), id="read-timeout"),
+        ],
+    )
+    def test_retries_transient_failures(self, monkeypatch, failure):
+        """Test throttling, 5xx and transport errors are retried until the request succeeds"""
+        handler, calls = failing_then_ok(failure)
+
+        data, waits = run_get_json(handler, monkeypatch)
+
+        assert data == [{"session_key": 9662}]
+        assert len(calls) == 2
+        assert len(waits) == 1
+
+    @pytest.mark.parametrize("status_code", [400, 401, 403, 404, 422])
+    def test_client_errors_fail_fast(self, monkeypatch, status_code):
+        """Test 4xx responses other than 429 are raised without a retry"""
+        handler, calls = failing_then_ok(httpx.Response(status_code))
+
+        with pytest.raises(httpx.HTTPStatusError) as exc_info:
+            run_get_json(handler, monkeypatch)
+
+        assert exc_info.value.response.status_code == status_code
+        assert len(calls) == 1
+
+    def test_gives_up_after_six_attempts(self, monkeypatch):
+        """Test a persistently failing endpoint is tried six times, then the error is raised"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        with pytest.raises(httpx.HTTPStatusError) as exc_info:
+            run_get_json(handler, monkeypatch)
+
+        assert exc_info.value.response.status_code == 503
+        assert len(calls) == 6
+
+    def test_honours_retry_after_seconds(self, monkeypatch):
+        """Test a 429 with Retry-After waits exactly the requested number of seconds"""
+        handler, calls = failing_then_ok(httpx.Response(429, headers={"Retry-After": "7"}))
+
+        _, waits = run_get_json(handler, monkeypatch)
+
+        assert waits == [7.0]
+
+    def test_honours_retry_after_date(self, monkeypatch):
+        """Test a Retry-After HTTP date waits until that time"""
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=20)
+        handler, calls = failing_then_ok(
+            httpx.Response(503, headers={"Retry-After": format_datetime(retry_at, usegmt=True)})
+        )
+
+        _, [wait] = run_get_json(handler, monkeypatch)
+
+        assert 15 <= wait <= 20
+
+    def test_caps_retry_after(self, monkeypatch):
+        """Test an excessive Retry-After is capped"""
+        handler, calls = failing_then_ok(httpx.Response(429, headers={"Retry-After": "3600"}))
+
+        _, waits = run_get_json(handler, monkeypatch)
+
+        assert waits == [extract.MAX_RETRY_AFTER]
+
+    def test_backs_off_without_retry_after(self, monkeypatch):
+        """Test retries without Retry-After use the jittered exponential backoff"""
+        handler, calls = failing_then_ok(httpx.Response(429), httpx.Response(429), httpx.Response(429))
+
+        _, waits = run_get_json(handler, monkeypatch)
+
+        # wait_random_exponential draws from [0, 2 ** (attempt - 1)] seconds
+        assert len(waits) == 3
+        assert all(0 <= wait <= 2 ** (attempt - 1) for attempt, wait in enumerate(waits, 1))
+
+
+def run_extract(handler):
+    """Run extract_session_data against a MockTransport, failing instead of hanging"""
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await asyncio.wait_for(extract.extract_session_data(9662, client), timeout=5)
+
+    return asyncio.run(run())
+
+
+class TestExtractSessionData:
+    """Tests for the concurrent per-session fetches"""
+
+    def test_returns_every_endpoint(self):
+        """Test a known session returns the rows of all four endpoints"""
+        async def handler(request):
+            return httpx.Response(200, json=[{"endpoint": request.url.path.rsplit("/", 1)[-1]}])
+
+        data = run_extract(handler)
+
+        assert data == {
+            "sessions": [{"endpoint": "sessions"}],
+            "drivers": [{"endpoint": "drivers"}],
+            "laps": [{"endpoint": "laps"}],
+            "positions": [{"endpoint": "position"}],
+        }
+
+    def test_unknown_session_cancels_detail_fetches(self):
+        """Test an empty /sessions cancels the in-flight detail requests and returns empty data"""
+        cancelled = []
+
+        async def handler(request):
+            endpoint = request.url.path.rsplit("/", 1)[-1]
+            if endpoint == "sessions":
+                return httpx.Response(200, json=[])
+            try:
+                # Detail requests never answer on their own
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(endpoint)
+                raise
+
+        data = run_extract(handler)
+
+        assert data == {"sessions": [], "drivers": [], "laps": [], "positions": []}
+        assert sorted(cancelled) == ["drivers", "laps", "position"]
+
+    def test_failing_endpoint_raises_original_error(self):
+        """Test one failing fetch raises its own exception rather than an ExceptionGroup"""
+        async def handler(request):
+            if request.url.path.endswith("/laps"):
+                return httpx.Response(404)
+            return httpx.Response(200, json=[{"session_key": 9662}])
+
+        with pytest.raises(httpx.HTTPStatusError) as exc_info:
+            run_extract(handler)
+
+        assert exc_info.value.response.status_code == 404
+        assert exc_info.value.request.url.path.endswith("/laps")
@@ -0,0 +1,88 @@
+import pytest
+
+import generate_readme
+
+PACKAGES = [("httpx", "0.28.1"), ("orjson", "3.13.0")]
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """Point the generator at a temporary project with a fixed package list"""
+    (tmp_path / "pyproject.toml").write_text('[project]\ndependencies = ["httpx>=0.28.1"]\n')
+    monkeypatch.setattr(generate_readme, "PROJECT_ROOT", tmp_path)
+    monkeypatch.setattr(generate_readme, "get_all_installed_packages", lambda: PACKAGES)
+    # pyproject.toml is cached per run; don't leak it between tests
+    generate_readme._read_pyproject.cache_clear()
+    generate_readme._load_pyproject.cache_clear()
+    yield tmp_path
+    generate_readme._read_pyproject.cache_clear()
+    generate_readme._load_pyproject.cache_clear()
+
+
+class TestReadmeSignature:
+    """Tests for skipping README regeneration when its inputs are unchanged"""
+
+    def test_matching_signature_is_current(self, tmp_path):
+        """Test a README whose first line carries the same signature is current"""
+        readme = tmp_path / "README.md"
+        readme.write_text(generate_readme.README_SIGNATURE.format(signature="abc123") + "# ApexML\n")
+
+        assert generate_readme.readme_is_current(readme, "abc123")
+
+    def test_stale_signature_is_not_current(self, tmp_path):
+        """Test a README generated from other inputs is not current"""
+        readme = tmp_path / "README.md"
+        readme.write_text(generate_readme.README_SIGNATURE.format(signature="old456") + "# ApexML\n")
+
+        assert not generate_readme.readme_is_current(readme, "abc123")
+
+    def test_signature_must_be_first_line(self, tmp_path):
+        """Test a signature anywhere but the first line is ignored"""
+        readme = tmp_path / "README.md"
+        readme.write_text("# ApexML\n" + generate_readme.README_SIGNATURE.format(signature="abc123"))
+
+        assert not generate_readme.readme_is_current(readme, "abc123")
+
+    def test_missing_readme_is_not_current(self, tmp_path):
+        """Test a missing README needs generating"""
+        assert not generate_readme.readme_is_current(tmp_path / "README.md", "abc123")
+
+    def test_signature_tracks_packages(self, project):
+        """Test the signature changes when an installed package version changes"""
+        upgraded = [("httpx", "0.28.1"), ("orjson", "3.13.1")]
+
+        assert generate_readme.compute_signature(PACKAGES) == generate_readme.compute_signature(PACKAGES)
+        assert generate_readme.compute_signature(PACKAGES) != generate_readme.compute_signature(upgraded)
+
+    def test_skips_current_readme(self, project):
+        """Test generate_readme leaves a README with a matching signature untouched"""
+        readme = project / "README.md"
+        signature = generate_readme.compute_signature(PACKAGES)
+        content = generate_readme.README_SIGNATURE.format(signature=signature) + "unchanged\n"
+        readme.write_text(content)
+
+        generate_readme.generate_readme()
+
+        assert readme.read_text() == content
+
+    def test_regenerates_stale_readme(self, project):
+        """Test generate_readme rewrites a README with a stale signature"""
+        readme = project / "README.md"
+        readme.write_text(generate_readme.README_SIGNATURE.format(signature="stale") + "outdated\n")
+
+        generate_readme.generate_readme()
+
+        signature = generate_readme.compute_signature(PACKAGES)
+        content = readme.read_text(encoding="utf-8")
+        assert content.startswith(generate_readme.README_SIGNATURE.format(signature=signature))
+        assert "outdated" not in content
+        assert "httpx>=0.28.1" in content
+        assert generate_readme.readme_is_current(readme, signature)
+
+    def test_generates_missing_readme(self, project):
+        """Test generate_readme writes a README when none exists"""
+        generate_readme.generate_readme()
+
+        readme = project / "README.md"
+        assert readme.exists()
+        assert generate_readme.readme_is_current(readme, generate_readme.compute_signature(PACKAGES))
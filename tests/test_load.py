@@ -0,0 +1,166 @@
+import re
+from pathlib import Path
+
+import pyarrow.parquet as pq
+import pytest
+
+import load
+
+
+class FakeCursor:
+    """Cursor that records each statement and can fail on a chosen one"""
+
+    def __init__(self, fail_on=None):
+        self.statements = []
+        self.fail_on = fail_on
+        self.put_files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql, params=None):
+        statement = " ".join(sql.split())
+        self.statements.append(statement)
+        if statement.startswith("PUT "):
+            # Read the Parquet file's columns while it exists for the upload
+            path = Path(re.search(r"'file://(.+?)'", statement).group(1))
+            self.put_files.append((path, pq.read_schema(path).names))
+        if self.fail_on and statement.startswith(self.fail_on):
+            raise RuntimeError(f"{self.fail_on} failed")
+
+
+class FakeConnection:
+    """Connection that hands out one FakeCursor and counts commits/rollbacks"""
+
+    def __init__(self, fail_on=None):
+        self.cursor_obj = FakeCursor(fail_on)
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self.cursor_obj
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+LAPS = [
+    {
+        "session_key": 9662, "driver_number": 1, "lap_number": 1,
+        "lap_duration": 91.2, "duration_sector_1": 30.1, "duration_sector_2": 30.5,
+        "duration_sector_3": 30.6, "is_pit_out_lap": False,
+        "date_start": "2024-11-03T15:03:00+00:00", "segments_sector_1": [2048],
+    },
+    {
+        "session_key": 9662, "driver_number": 1, "lap_number": 2,
+        "lap_duration": 90.8, "duration_sector_1": 30.0, "duration_sector_2": 30.4,
+        "duration_sector_3": 30.4, "is_pit_out_lap": False,
+        "date_start": "2024-11-03T15:04:31+00:00", "segments_sector_1": [2049],
+    },
+]
+
+
+class TestMergeSql:
+    """Tests for the upsert MERGE generated from a table's columns and keys"""
+
+    def test_dedupes_staged_rows_per_key(self):
+        """Test the source keeps one staged row per natural key"""
+        sql = " ".join(load._merge_sql("laps", "laps_staging", load.LAPS_COLUMNS, load.LAPS_KEYS).split())
+
+        assert "MERGE INTO laps t" in sql
+        assert (
+            "USING ( SELECT * FROM laps_staging "
+            "QUALIFY ROW_NUMBER() OVER (PARTITION BY session_key, driver_number, lap_number ORDER BY 1) = 1 ) s"
+        ) in sql
+
+    def test_joins_keys_with_equal_null(self):
+        """Test keys are matched with EQUAL_NULL so NULL key parts match"""
+        sql = " ".join(load._merge_sql("drivers", "drivers_staging", load.DRIVERS_COLUMNS, load.DRIVERS_KEYS).split())
+
+        assert (
+            "ON EQUAL_NULL(t.session_key, s.session_key) "
+            "AND EQUAL_NULL(t.driver_number, s.driver_number) WHEN MATCHED"
+        ) in sql
+
+    def test_updates_only_non_key_columns(self):
+        """Test the matched branch updates every non-key column and ingested_at"""
+        sql = " ".join(load._merge_sql("positions", "positions_staging", load.POSITIONS_COLUMNS, load.POSITIONS_KEYS).split())
+
+        assert (
+            "WHEN MATCHED THEN UPDATE SET t.position = s.position, t.ingested_at = SYSDATE() "
+            "WHEN NOT MATCHED"
+        ) in sql
+
+    def test_inserts_every_column_with_server_timestamp(self):
+        """Test new rows get every column plus a SYSDATE() ingested_at"""
+        sql = " ".join(load._merge_sql("positions", "positions_staging", load.POSITIONS_COLUMNS, load.POSITIONS_KEYS).split())
+
+        assert sql.endswith(
+            "WHEN NOT MATCHED THEN INSERT (session_key, driver_number, date, position, ingested_at) "
+            "VALUES (s.session_key, s.driver_number, s.date, s.position, SYSDATE())"
+        )
+
+
+class TestBulkLoad:
+    """Tests for the stage, PUT, COPY, MERGE sequence behind every RAW load"""
+
+    def test_commits_after_merge(self):
+        """Test a load runs stage, PUT, staging table, COPY and MERGE, then commits"""
+        conn = FakeConnection()
+
+        count = load._bulk_load(conn, "laps", LAPS, load.LAPS_SCHEMA, load.LAPS_COLUMNS, load.LAPS_KEYS)
+
+        statements = conn.cursor_obj.statements
+        assert count == 2
+        assert [s.split(" ")[0] for s in statements] == ["CREATE", "PUT", "CREATE", "COPY", "MERGE"]
+        assert statements[0] == f"CREATE TEMPORARY STAGE IF NOT EXISTS {load.LOAD_STAGE}"
+        assert statements[1].endswith(f"@{load.LOAD_STAGE} AUTO_COMPRESS = FALSE")
+        assert statements[2] == "CREATE OR REPLACE TEMPORARY TABLE laps_staging LIKE laps"
+        assert statements[3].startswith(f"COPY INTO laps_staging FROM @{load.LOAD_STAGE}/laps_")
+        assert "MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE PURGE = TRUE" in statements[3]
+        assert statements[4].startswith("MERGE INTO laps t USING ( SELECT * FROM laps_staging")
+        assert (conn.commits, conn.rollbacks) == (1, 0)
+
+    def test_uploads_renamed_parquet_file(self):
+        """Test the uploaded file has the RAW column names and is removed afterwards"""
+        conn = FakeConnection()
+
+        load._bulk_load(conn, "laps", LAPS, load.LAPS_SCHEMA, load.LAPS_COLUMNS, load.LAPS_KEYS)
+
+        [(path, columns)] = conn.cursor_obj.put_files
+        assert path.suffix == ".parquet"
+        assert columns == load.LAPS_COLUMNS
+        assert not path.exists()
+
+    def test_rolls_back_when_merge_fails(self):
+        """Test a failing statement rolls back, skips the commit and re-raises"""
+        conn = FakeConnection(fail_on="MERGE")
+
+        with pytest.raises(RuntimeError, match="MERGE failed"):
+            load._bulk_load(conn, "laps", LAPS, load.LAPS_SCHEMA, load.LAPS_COLUMNS, load.LAPS_KEYS)
+
+        assert (conn.commits, conn.rollbacks) == (0, 1)
+
+    def test_rolls_back_when_copy_fails(self):
+        """Test a failing COPY stops before the MERGE and rolls back"""
+        conn = FakeConnection(fail_on="COPY")
+
+        with pytest.raises(RuntimeError, match="COPY failed"):
+            load._bulk_load(conn, "laps", LAPS, load.LAPS_SCHEMA, load.LAPS_COLUMNS, load.LAPS_KEYS)
+
+        assert not any(s.startswith("MERGE") for s in conn.cursor_obj.statements)
+        assert (conn.commits, conn.rollbacks) == (0, 1)
+
+    def test_skips_empty_batches(self):
+        """Test an empty batch touches neither the cursor nor the transaction"""
+        conn = FakeConnection()
+
+        assert load._bulk_load(conn, "laps", [], load.LAPS_SCHEMA, load.LAPS_COLUMNS, load.LAPS_KEYS) == 0
+        assert conn.cursor_obj.statements == []
+        assert (conn.commits, conn.rollbacks) == (0, 0)
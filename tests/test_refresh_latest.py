@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import refresh_latest
+
+NOW = datetime.now(timezone.utc)
+THIS_YEAR = NOW.year
+LAST_YEAR = NOW.year - 1
+
+
+def race(session_key, ended_days_ago):
+    """A Race session that ended the given number of days ago (negative is upcoming)"""
+    date_end = NOW - timedelta(days=ended_days_ago)
+    return {
+        "session_key": session_key,
+        "session_type": "Race",
+        "date_end": date_end.isoformat().replace("+00:00", "Z"),
+    }
+
+
+@pytest.fixture
+def sessions_by_year(monkeypatch):
+    """Serve fetch_sessions from a per-year dict and record each call"""
+    by_year = {}
+    calls = []
+
+    async def fake_fetch_sessions(client, year=None, session_key=None, session_type=None):
+        calls.append((year, session_type))
+        return by_year.get(year, [])
+
+    monkeypatch.setattr(refresh_latest, "fetch_sessions", fake_fetch_sessions)
+    return by_year, calls
+
+
+class TestGetLatestRaceSession:
+    """Tests for picking the most recent completed race"""
+
+    def test_latest_completed_race_this_year(self, sessions_by_year):
+        """Test a completed race this season is returned without asking for last season"""
+        by_year, calls = sessions_by_year
+        by_year[THIS_YEAR] = [race(1, 14), race(2, 7), race(3, -7)]
+
+        latest = asyncio.run(refresh_latest.get_latest_race_session(client=object()))
+
+        assert latest["session_key"] == 2
+        assert calls == [(THIS_YEAR, "Race")]
+
+    def test_falls_back_to_previous_year(self, sessions_by_year):
+        """Test a season with no completed race yet falls back to last season's latest"""
+        by_year, calls = sessions_by_year
+        by_year[THIS_YEAR] = [race(10, -3), race(11, -10)]
+        by_year[LAST_YEAR] = [race(8, 120), race(9, 100)]
+
+        latest = asyncio.run(refresh_latest.get_latest_race_session(client=object()))
+
+        assert latest["session_key"] == 9
+        assert calls == [(THIS_YEAR, "Race"), (LAST_YEAR, "Race")]
+
+    def test_no_races_in_either_year(self, sessions_by_year):
+        """Test None is returned when neither season has a completed race"""
+        by_year, calls = sessions_by_year
+
+        assert asyncio.run(refresh_latest.get_latest_race_session(client=object())) is None
+        assert calls == [(THIS_YEAR, "Race"), (LAST_YEAR, "Race")]
+
+    def test_latest_is_chosen_by_date_end(self, sessions_by_year):
+        """Test the race with the latest date_end wins regardless of API order"""
+        by_year, _ = sessions_by_year
+        by_year[THIS_YEAR] = [race(4, 2), race(5, 30), race(6, 1), race(7, 9)]
+
+        latest = asyncio.run(refresh_latest.get_latest_race_session(client=object()))
+
+        assert latest["session_key"] == 6
+
+    def test_ignores_sessions_without_date_end(self, sessions_by_year):
+        """Test sessions with no date_end are not treated as completed"""
+        by_year, _ = sessions_by_year
+        by_year[THIS_YEAR] = [{"session_key": 12, "session_type": "Race", "date_end": None}]
+        by_year[LAST_YEAR] = [race(13, 60)]
+
+        latest = asyncio.run(refresh_latest.get_latest_race_session(client=object()))
+
+        assert latest["session_key"] == 13